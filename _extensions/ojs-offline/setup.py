@@ -18,198 +18,127 @@ Custom libraries can be added in _quarto.yml:
 """
 
 import argparse
+import base64
+import functools
+import gzip
+import hashlib
+import http.client
 import io
 import json
 import os
+import queue
 import re
+import shutil
+import socket
+import ssl
 import sys
 import tarfile
 import tempfile
+import threading
+import time
 import urllib.request
 import urllib.error
 import urllib.parse
+import zlib
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import IO, Callable, Dict, List, Any, Optional, Tuple
 
-# Try to import yaml, fall back to simple parsing if not available
 try:
-    import yaml
-    HAS_YAML = True
+    import orjson  # Optional, faster JSON serialization
 except ImportError:
-    HAS_YAML = False
-
-# Dependencies to download
-# Each dependency can have "files" (required) and "optional_files" (nice to have)
-DEPENDENCIES = {
-    # Core Observable libraries
-    "@observablehq/inputs": {
-        "version": "0.10.6",
-        "files": [
-            "dist/inputs.min.js"
-        ],
-        "optional_files": [
-            "dist/inputs.min.js.map"
-        ]
-    },
-    "@observablehq/plot": {
-        "version": "0.6.11",
-        "files": [
-            "dist/plot.umd.min.js"
-        ],
-        "optional_files": [
-            "dist/plot.umd.min.js.map"
-        ]
-    },
-    "@observablehq/graphviz": {
-        "version": "0.2.1",
-        "files": [
-            "dist/graphviz.min.js"
-        ]
-    },
-    "@observablehq/highlight.js": {
-        "version": "2.0.0",
-        "files": [
-            "highlight.min.js"
-        ]
-    },
-    "@observablehq/katex": {
-        "version": "0.11.1",
-        "files": [
-            "dist/katex.min.js",
-            "dist/katex.min.css"
-        ]
-    },
-    # Data visualization
-    "d3": {
-        "version": "7.8.5",
-        "files": [
-            "dist/d3.min.js"
-        ],
-        "optional_files": [
-            "dist/d3.min.js.map"
-        ]
-    },
-    "vega": {
-        "version": "5.22.1",
-        "files": [
-            "build/vega.min.js"
-        ],
-        "optional_files": [
-            "build/vega.min.js.map"
-        ]
-    },
-    "vega-lite": {
-        "version": "5.6.0",
-        "files": [
-            "build/vega-lite.min.js"
-        ],
-        "optional_files": [
-            "build/vega-lite.min.js.map"
-        ]
-    },
-    "vega-lite-api": {
-        "version": "5.0.0",
-        "files": [
-            "build/vega-lite-api.min.js"
-        ],
-        "optional_files": [
-            "build/vega-lite-api.min.js.map"
-        ]
-    },
-    # Data processing
-    "arquero": {
-        "version": "4.8.8",
-        "files": [
-            "dist/arquero.min.js"
-        ],
-        "optional_files": [
-            "dist/arquero.min.js.map"
-        ]
-    },
-    "apache-arrow": {
-        "version": "11.0.0",
-        "files": [
-            "Arrow.es2015.min.js"
-        ],
-        "optional_files": [
-            "Arrow.es2015.min.js.map"
-        ]
-    },
-    "@duckdb/duckdb-wasm": {
-        "version": "1.24.0",
-        "files": [
-            "dist/duckdb-mvp.wasm",
-            "dist/duckdb-eh.wasm",
-            "dist/duckdb-browser-mvp.worker.js",
-            "dist/duckdb-browser-eh.worker.js"
-        ]
-    },
-    "sql.js": {
-        "version": "1.8.0",
-        "files": [
-            "dist/sql-wasm.js",
-            "dist/sql-wasm.wasm"
-        ]
-    },
-    # Utilities
-    "htl": {
-        "version": "0.3.1",
-        "files": [
-            "dist/htl.min.js"
-        ],
-        "optional_files": [
-            "dist/htl.min.js.map"
-        ]
-    },
-    "lodash": {
-        "version": "4.17.21",
-        "files": [
-            "lodash.min.js"
-        ]
-    },
-    "jszip": {
-        "version": "3.10.1",
-        "files": [
-            "dist/jszip.min.js"
-        ]
-    },
-    "marked": {
-        "version": "0.3.12",
-        "files": [
-            "marked.min.js"
-        ]
-    },
-    "topojson-client": {
-        "version": "3.1.0",
-        "files": [
-            "dist/topojson-client.min.js"
-        ]
-    },
-    "exceljs": {
-        "version": "4.3.0",
-        "files": [
-            "dist/exceljs.min.js"
-        ]
-    },
-    "leaflet": {
-        "version": "1.9.4",
-        "files": [
-            "dist/leaflet.js",
-            "dist/leaflet.css"
-        ]
-    },
-    "mermaid": {
-        "version": "10.6.1",
-        "files": [
-            "dist/mermaid.min.js"
-        ],
-        "optional_files": [
-            "dist/mermaid.min.js.map"
-        ]
-    }
-}
+    orjson = None
+
+# PyYAML module, imported on first use (see _import_yaml)
+_yaml_module = None
+
+# User-Agent sent with all registry requests
+USER_AGENT = 'Quarto-OJS-Offline-Extension/1.0'
+
+# Buffer size used when streaming downloads to disk
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Files extracted from tarballs are kept in memory up to this size, and
+# written to temporary files beyond it
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# Files larger than this are downloaded in CHUNK_PARTS parallel HTTP range
+# requests (after the first CHUNK_SPLIT_MIN bytes), if the server supports it
+CHUNK_SPLIT_MIN = 4 * 1024 * 1024
+CHUNK_PARTS = 4
+
+# Default number of parallel download workers
+DEFAULT_JOBS = 8
+
+# Maximum number of concurrent requests sent to a single host, to avoid
+# being rate limited (HTTP 429) by CDNs and registry mirrors
+MAX_CONNECTIONS_PER_HOST = 8
+
+# Persistent cache for npm metadata and tarballs, shared between projects
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'quarto-ojs-offline'
+
+# Guards tarballs/index.json, which all npm registries of a run share. Other
+# processes may still overwrite entries, which only costs a new download.
+_TARBALL_INDEX_LOCK = threading.Lock()
+
+# Hash algorithms of npm integrity strings, strongest first
+INTEGRITY_ALGORITHMS = ('sha512', 'sha384', 'sha256', 'sha1')
+
+# How long cached metadata of floating versions (tags, ranges) stays valid;
+# metadata of exact versions is immutable and cached forever
+METADATA_TTL = 24 * 60 * 60
+
+# Public CDN tried first by npm registries, so single files can be fetched
+# without downloading whole tarballs (disable with --no-cdn-fallback)
+PUBLIC_CDN_URL = "https://cdn.jsdelivr.net/npm"
+
+# Timeout for the public CDN, kept short so unreachable networks fail fast
+PUBLIC_CDN_TIMEOUT = 10
+
+# Exact semver versions, e.g. "1.2.3" or "1.0.0-rc.1"
+EXACT_VERSION_RE = re.compile(r'^\d+\.\d+\.\d+(?:[-+][0-9A-Za-z.+-]+)?$')
+
+@dataclass(frozen=True)
+class Package:
+    """An npm package and the files to download from it"""
+    name: str
+    version: str
+    files: Tuple[str, ...]                 # Required, the first one is the main entry
+    optional_files: Tuple[str, ...] = ()   # Nice to have (e.g. source maps)
+
+
+@dataclass(frozen=True)
+class DownloadTask:
+    """A single file to download, and where to record it in the dependency map"""
+    name: str
+    version: str
+    file_path: str
+    local_path: Path
+    optional: bool
+    map_key: str     # package@version/file_path
+    map_value: str   # Path relative to the HTML document's libs directory
+    main: bool       # Main entry of the package, also mapped by package name
+    registry: 'RegistryStrategy'  # Registry (or mirror) the file is downloaded from
+
+
+def load_dependencies(path: Path) -> Tuple[Package, ...]:
+    """Load the built-in dependencies from a JSON list of packages"""
+    content = path.read_bytes()
+    entries = orjson.loads(content) if orjson is not None else json.loads(content)
+    return tuple(
+        Package(entry['name'], entry['version'], tuple(entry['files']),
+                tuple(entry.get('optional_files', ())))
+        for entry in entries
+    )
+
+
+# Dependencies to download, kept in deps.json next to this script
+DEPENDENCIES_FILE = Path(__file__).parent / "deps.json"
+DEPENDENCIES: Tuple[Package, ...] = load_dependencies(DEPENDENCIES_FILE)
 
 
 class RegistryType(Enum):
@@ -219,6 +148,17 @@ class RegistryType(Enum):
     AUTO = "auto"          # Auto-detect based on URL
 
 
+# CDN-style registries that serve files directly
+_CDN_PATTERNS = frozenset({
+    'jsdelivr.net',
+    'unpkg.com',
+    'cdnjs.cloudflare.com',
+    'cdn.skypack.dev',
+    'esm.sh',
+})
+
+
+@functools.lru_cache(maxsize=None)
 def detect_registry_type(registry_url: str) -> RegistryType:
     """
     Auto-detect the registry type based on URL hostname.
@@ -230,18 +170,8 @@ def detect_registry_type(registry_url: str) -> RegistryType:
         parsed = urllib.parse.urlparse(registry_url)
         hostname = parsed.netloc.lower()
 
-        # CDN-style registries that serve files directly
-        cdn_patterns = [
-            'jsdelivr.net',
-            'unpkg.com',
-            'cdnjs.cloudflare.com',
-            'cdn.skypack.dev',
-            'esm.sh',
-        ]
-
-        for pattern in cdn_patterns:
-            if pattern in hostname:
-                return RegistryType.JSDELIVR
+        if any(pattern in hostname for pattern in _CDN_PATTERNS):
+            return RegistryType.JSDELIVR
 
         # Everything else is assumed to be npm protocol
         return RegistryType.NPM
@@ -250,31 +180,406 @@ def detect_registry_type(registry_url: str) -> RegistryType:
         return RegistryType.NPM
 
 
+@functools.lru_cache(maxsize=None)
+def encode_package_name(package_name: str) -> str:
+    """
+    Encode package name for npm registry URL.
+
+    Scoped packages like @duckdb/duckdb-wasm need special handling:
+    @duckdb/duckdb-wasm -> @duckdb%2Fduckdb-wasm
+    """
+    if package_name.startswith('@') and '/' in package_name:
+        # Scoped package: encode the slash
+        scope, name = package_name.split('/', 1)
+        return f"{scope}%2F{name}"
+    return package_name
+
+
+def dump_json(data: Any) -> bytes:
+    """Serialize data as indented JSON with sorted keys, with orjson if installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    return json.dumps(data, indent=2, sort_keys=True).encode()
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """Write a JSON file so that readers (even in other processes) never see it half-written"""
+    with tempfile.NamedTemporaryFile('wb', dir=path.parent, prefix=path.name,
+                                     suffix='.tmp', delete=False) as f:
+        f.write(dump_json(data))
+    os.replace(f.name, path)
+
+
+def copy_file_data(src: IO[bytes], dest: IO[bytes]) -> int:
+    """
+    Copy src from its current position to dest, returning the number of bytes copied
+
+    Between two files on disk, os.sendfile() copies the data inside the
+    kernel instead of through Python buffers.
+    """
+    start = src.tell()
+    if hasattr(os, 'sendfile'):
+        try:
+            in_fd, out_fd = src.fileno(), dest.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            in_fd = out_fd = None
+        if in_fd is not None:
+            dest.flush()
+            offset = start
+            try:
+                while True:
+                    sent = os.sendfile(out_fd, in_fd, offset, COPY_BUFFER_SIZE * 16)
+                    if not sent:
+                        break
+                    offset += sent
+            except OSError:
+                if offset != start:
+                    raise
+                # Not supported for these files (e.g. on macOS), copy them below
+            else:
+                src.seek(offset)
+                dest.seek(0, io.SEEK_END)
+                return offset - start
+
+    shutil.copyfileobj(src, dest, COPY_BUFFER_SIZE)
+    return src.tell() - start
+
+
+def file_sha256(path: Path) -> str:
+    """Get the SHA-256 hex digest of a file"""
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):  # Python 3.11+, hashes without holding the GIL
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+        return digest.hexdigest()
+
+
+def parse_integrity(dist: Dict[str, Any]) -> Optional[Tuple[str, bytes]]:
+    """
+    Get the strongest (algorithm, digest) published for a package tarball
+
+    Reads the subresource integrity string of dist.integrity (e.g.
+    "sha512-<base64>"), or the older dist.shasum (SHA-1 in hex).
+    """
+    digests = {}
+    for entry in (dist.get('integrity') or '').split():
+        algorithm, _, digest = entry.partition('-')
+        if algorithm in INTEGRITY_ALGORITHMS:
+            try:
+                digests[algorithm] = base64.b64decode(digest.split('?', 1)[0], validate=True)
+            except ValueError:
+                pass
+    if 'sha1' not in digests and dist.get('shasum'):
+        try:
+            digests['sha1'] = bytes.fromhex(dist['shasum'])
+        except (TypeError, ValueError):
+            pass
+    for algorithm in INTEGRITY_ALGORITHMS:
+        if algorithm in digests:
+            return algorithm, digests[algorithm]
+    return None
+
+
+class TeeReader:
+    """
+    File-like wrapper copying everything read from a stream into another file
+
+    The data is hashed too: with SHA-256, to name the copy, and with the
+    algorithm of expected (algorithm, digest), to check it with matches().
+    """
+
+    def __init__(self, stream, sink: Optional[IO[bytes]] = None,
+                 expected: Optional[Tuple[str, bytes]] = None):
+        self._stream = stream
+        self._sink = sink
+        self.sha256 = hashlib.sha256()
+        self._expected = expected
+        self._check = hashlib.new(expected[0]) if expected else None
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        if self._sink is not None:
+            self._sink.write(data)
+        self.sha256.update(data)
+        if self._check is not None:
+            self._check.update(data)
+        return data
+
+    def matches(self) -> bool:
+        """Check the data read so far against the expected digest, if any"""
+        return self._check is None or self._check.digest() == self._expected[1]
+
+    def drain(self) -> None:
+        """Copy the rest of the stream"""
+        while self.read(64 * 1024):
+            pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent HTTP(S) connections.
+
+    Each thread keeps one keep-alive connection per host, so consecutive
+    requests to the same CDN or registry reuse the TCP/TLS session instead of
+    reconnecting for every file. Failed connections and transient server
+    errors are retried with exponential backoff, and errors are raised as
+    urllib.error exceptions so callers can handle them like urlopen() errors.
+
+    A single pool is shared by all registries of a run; the timeout and
+    number of retries can be overridden per request. At most max_per_host
+    requests are in flight to each host at once, whichever thread or
+    registry sends them.
+    """
+
+    RETRY_STATUSES = frozenset({429, 502, 503, 504})
+    REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+    MAX_REDIRECTS = 5
+
+    def __init__(self, timeout: int = 30, retries: int = 3, backoff_factor: float = 0.3,
+                 max_per_host: int = MAX_CONNECTIONS_PER_HOST):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_per_host = max_per_host
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._all_connections: List[http.client.HTTPConnection] = []
+        self._ssl_context = ssl.create_default_context()
+        # Honour http_proxy/https_proxy/no_proxy like urlopen() does
+        self._proxies = urllib.request.getproxies()
+
+    def _connections(self) -> Dict:
+        """Connections owned by the current thread, keyed by (scheme, netloc)"""
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = {}
+        return self._local.connections
+
+    def _connect(self, scheme: str, netloc: str, timeout: float):
+        """Open a connection, returning it with a flag telling if it goes through a proxy"""
+        host = urllib.parse.urlsplit(f"//{netloc}").hostname or netloc
+        proxy = self._proxies.get(scheme)
+        if proxy and urllib.request.proxy_bypass(host):
+            proxy = None
+
+        if not proxy:
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(netloc, timeout=timeout,
+                                                   context=self._ssl_context)
+            else:
+                conn = http.client.HTTPConnection(netloc, timeout=timeout)
+            return conn, False
+
+        parsed = urllib.parse.urlsplit(proxy if '://' in proxy else f"http://{proxy}")
+        proxy_netloc = f"{parsed.hostname}:{parsed.port or 80}"
+        proxy_headers = {}
+        if parsed.username:
+            credentials = f"{urllib.parse.unquote(parsed.username)}:{urllib.parse.unquote(parsed.password or '')}"
+            proxy_headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+
+        if scheme == 'https':
+            # Tunnel TLS through the proxy with CONNECT
+            conn = http.client.HTTPSConnection(proxy_netloc, timeout=timeout,
+                                               context=self._ssl_context)
+            conn.set_tunnel(netloc, headers=proxy_headers)
+            return conn, False
+
+        conn = http.client.HTTPConnection(proxy_netloc, timeout=timeout)
+        conn.proxy_headers = proxy_headers
+        return conn, True
+
+    def _get_connection(self, scheme: str, netloc: str, timeout: float):
+        key = (scheme, netloc)
+        connections = self._connections()
+        if key not in connections:
+            connections[key] = self._connect(scheme, netloc, timeout)
+            with self._lock:
+                self._all_connections.append(connections[key][0])
+        conn = connections[key][0]
+        if conn.timeout != timeout:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+        return connections[key]
+
+    def _discard_connection(self, scheme: str, netloc: str) -> None:
+        conn, _ = self._connections().pop((scheme, netloc), (None, None))
+        if conn is not None:
+            conn.close()
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(self.backoff_factor * (2 ** attempt))
+
+    def _host_slot(self, netloc: str) -> threading.BoundedSemaphore:
+        """Get the semaphore capping concurrent requests to a host"""
+        with self._lock:
+            if netloc not in self._host_slots:
+                self._host_slots[netloc] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[netloc]
+
+    def _request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                 timeout: Optional[float] = None,
+                 retries: Optional[int] = None) -> http.client.HTTPResponse:
+        """
+        Send a request, following redirects and retrying transient failures.
+
+        The response body must be read completely before the calling thread
+        sends another request to the same host.
+        """
+        headers = dict(headers or {})
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        redirects = 0
+
+        while True:
+            parsed = urllib.parse.urlsplit(url)
+            if parsed.scheme not in ('http', 'https'):
+                raise urllib.error.URLError(f"unsupported URL scheme: {url}")
+            conn, via_proxy = self._get_connection(parsed.scheme, parsed.netloc, timeout)
+
+            target = parsed.path or '/'
+            if parsed.query:
+                target += '?' + parsed.query
+            request_headers = headers
+            if via_proxy:
+                # Plain HTTP through a proxy uses absolute request targets
+                target = url
+                request_headers = {**headers, **conn.proxy_headers}
+
+            # Servers may close idle keep-alive connections at any time
+            reused = conn.sock is not None
+            try:
+                conn.request(method, target, headers=request_headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                self._discard_connection(parsed.scheme, parsed.netloc)
+                if reused and not isinstance(e, socket.timeout):
+                    # Stale connection: retry on a new one, without using up a retry
+                    continue
+                if attempt < retries:
+                    self._backoff(attempt)
+                    attempt += 1
+                    continue
+                raise urllib.error.URLError(e)
+
+            location = response.getheader('Location')
+            if (response.status in self.REDIRECT_STATUSES and location
+                    and redirects < self.MAX_REDIRECTS):
+                response.read()
+                url = urllib.parse.urljoin(url, location)
+                redirects += 1
+                if response.status == 303:
+                    method = 'GET'
+                continue
+
+            if response.status in self.RETRY_STATUSES and attempt < retries:
+                response.read()
+                self._backoff(attempt)
+                attempt += 1
+                continue
+
+            if response.status >= 400:
+                body = response.read()
+                raise urllib.error.HTTPError(url, response.status, response.reason,
+                                             response.headers, io.BytesIO(body))
+
+            response.url = url
+            return response
+
+    @contextmanager
+    def stream(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+               timeout: Optional[float] = None, retries: Optional[int] = None):
+        """
+        Send a request and yield the response for streaming its body.
+
+        The request counts against the limit of its host until the block
+        exits. If the body is not read to the end, the connection is closed
+        instead of being reused, since unread data would corrupt the next
+        response.
+        """
+        with self._host_slot(urllib.parse.urlsplit(url).netloc):
+            response = self._request(method, url, headers, timeout, retries)
+            try:
+                yield response
+            finally:
+                # http.client closes the response by itself once fully read
+                if not response.isclosed():
+                    parsed = urllib.parse.urlsplit(response.url)
+                    response.close()
+                    self._discard_connection(parsed.scheme, parsed.netloc)
+
+    def close(self) -> None:
+        """Close all connections opened by any thread"""
+        with self._lock:
+            for conn in self._all_connections:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._all_connections.clear()
+        self._local = threading.local()
+
+
 class RegistryStrategy(ABC):
     """Abstract base class for registry strategies"""
 
-    def __init__(self, registry_url: str, timeout: int = 30):
+    def __init__(self, registry_url: str, timeout: int = 30, retries: int = 3,
+                 pool: Optional[ConnectionPool] = None):
         self.registry_url = registry_url.rstrip('/')
         self.timeout = timeout
+        self.retries = retries
+        # Shared by all download workers (and usually all registries of a
+        # run) so requests reuse keep-alive connections
+        self._owns_pool = pool is None
+        self._pool = pool if pool is not None else ConnectionPool(timeout, retries)
 
     def _make_request(self, url: str, headers: Optional[Dict[str, str]] = None) -> bytes:
-        """Make an HTTP request and return the response content"""
-        req_headers = {'User-Agent': 'Quarto-OJS-Offline-Extension/1.0'}
+        """Make an HTTP request and return the (decompressed) response content"""
+        req_headers = {'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'}
         if headers:
             req_headers.update(headers)
 
-        req = urllib.request.Request(url, headers=req_headers)
-        with urllib.request.urlopen(req, timeout=self.timeout) as response:
-            return response.read()
+        with self._pool.stream('GET', url, headers=req_headers,
+                               timeout=self.timeout, retries=self.retries) as response:
+            content = response.read()
+
+        encoding = (response.getheader('Content-Encoding') or '').lower()
+        if encoding == 'gzip':
+            content = gzip.decompress(content)
+        elif encoding == 'deflate':
+            try:
+                content = zlib.decompress(content)
+            except zlib.error:
+                # Some servers send raw deflate data without the zlib header
+                content = zlib.decompress(content, -zlib.MAX_WBITS)
+        return content
+
+    def prepare(self, package_name: str, version: str, file_paths: Tuple[str, ...],
+                optional_paths: Tuple[str, ...] = ()) -> None:
+        """Announce the files that will be requested from a package (optional hint)"""
+        pass
 
     @abstractmethod
-    def get_file(self, package_name: str, version: str, file_path: str) -> bytes:
-        """Get file content from a package"""
+    def get_file_to(self, package_name: str, version: str, file_path: str, dest_path: Path,
+                    known_fingerprint: Optional[str] = None) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Save a file from a package to dest_path, returning its size and fingerprint
+
+        The fingerprint is a cheap identifier of the remote file's content
+        (or None if the registry cannot tell), used to detect unchanged files
+        without downloading them again: if known_fingerprint (from a previous
+        download) is still the remote one, nothing is downloaded and None is
+        returned.
+        """
         pass
 
     def cleanup(self):
-        """Clean up any resources (override in subclasses if needed)"""
-        pass
+        """Clean up any resources (extend in subclasses if needed)"""
+        if self._owns_pool:
+            self._pool.close()
 
 
 class JsDelivrRegistry(RegistryStrategy):
@@ -284,35 +589,220 @@ class JsDelivrRegistry(RegistryStrategy):
     URL pattern: {registry}/{package}@{version}/{file_path}
     """
 
-    def get_file(self, package_name: str, version: str, file_path: str) -> bytes:
-        """Get file directly from CDN URL"""
-        url = f"{self.registry_url}/{package_name}@{version}/{file_path}"
-        return self._make_request(url)
+    def __init__(self, registry_url: str, timeout: int = 30, retries: int = 3,
+                 pool: Optional[ConnectionPool] = None):
+        super().__init__(registry_url, timeout, retries, pool)
+        # {(package, version): URL prefix}, built once per package
+        self._package_urls: Dict[Tuple[str, str], str] = {}
+        # Workers for range requests, shared by all files so that their
+        # keep-alive connections are reused instead of opened for every file
+        self._chunk_executor: Optional[ThreadPoolExecutor] = None
+        self._chunk_executor_lock = threading.Lock()
+
+    def _get_chunk_executor(self) -> ThreadPoolExecutor:
+        with self._chunk_executor_lock:
+            if self._chunk_executor is None:
+                self._chunk_executor = ThreadPoolExecutor(
+                    max_workers=MAX_CONNECTIONS_PER_HOST, thread_name_prefix="chunk")
+            return self._chunk_executor
+
+    def _package_url(self, package_name: str, version: str) -> str:
+        key = (package_name, version)
+        url = self._package_urls.get(key)
+        if url is None:
+            url = self._package_urls[key] = f"{self.registry_url}/{package_name}@{version}"
+        return url
+
+    def _file_url(self, package_name: str, version: str, file_path: str) -> str:
+        return "/".join((self._package_url(package_name, version), file_path))
+
+    @staticmethod
+    def _fingerprint(response: http.client.HTTPResponse) -> Optional[str]:
+        return response.getheader('ETag') or response.getheader('Last-Modified')
+
+    def has_package(self, package_name: str, version: str) -> bool:
+        """Check whether the CDN serves a package, from its package.json (which every package has)"""
+        url = self._file_url(package_name, version, 'package.json')
+        try:
+            with self._pool.stream('HEAD', url, headers={'User-Agent': USER_AGENT},
+                                   timeout=self.timeout, retries=self.retries) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return False
+            raise
+        return True
+
+    CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+    def get_file_to(self, package_name: str, version: str, file_path: str, dest_path: Path,
+                    known_fingerprint: Optional[str] = None) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Stream a file to dest_path, taking the fingerprint from the same response
+
+        The first request only asks for the first CHUNK_SPLIT_MIN bytes. Small
+        files are complete after it, and for large ones the reported total size
+        is used to fetch the rest in parallel chunks, which is faster than a
+        single connection on high-latency links.
+
+        With a known fingerprint the first request is conditional, so an
+        unchanged file costs a single 304 response.
+        """
+        url = self._file_url(package_name, version, file_path)
+        headers = {'User-Agent': USER_AGENT}
+        if known_fingerprint:
+            # Fingerprints are ETags (always quoted) or Last-Modified dates
+            if known_fingerprint.startswith(('"', 'W/')):
+                headers['If-None-Match'] = known_fingerprint
+            else:
+                headers['If-Modified-Since'] = known_fingerprint
+        try:
+            result = self._download_range(url, dest_path, {**headers, 'Range': f"bytes=0-{CHUNK_SPLIT_MIN - 1}"})
+        except urllib.error.HTTPError as e:
+            if e.code != 416:  # Range Not Satisfiable, e.g. for empty files
+                raise
+            result = self._download_range(url, dest_path, headers)
+        if result is None:
+            return None
+        size, total, fingerprint = result
+
+        if total is not None and total > size:
+            try:
+                self._download_chunks(url, dest_path, size, total, fingerprint)
+                size = total
+            except (urllib.error.URLError, OSError, RuntimeError):
+                # Fall back to a single request for the whole file
+                size, _, fingerprint = self._download_range(url, dest_path, headers={'User-Agent': USER_AGENT})
+        return size, fingerprint
+
+    def _download_range(self, url: str, dest_path: Path, headers: Dict[str, str],
+                        offset: Optional[int] = None) -> Optional[Tuple[int, Optional[int], Optional[str]]]:
+        """
+        Save a response to dest_path, or at offset in it if given
+
+        Returns the number of bytes written, the total file size if the server
+        sent a partial response, and the fingerprint, or None if the server
+        answered a conditional request with 304 Not Modified.
+        """
+        with self._pool.stream('GET', url, headers=headers,
+                               timeout=self.timeout, retries=self.retries) as response:
+            total = None
+            if response.status == 304:
+                response.read()
+                return None
+            if response.status == 206:
+                match = self.CONTENT_RANGE_RE.match(response.getheader('Content-Range') or '')
+                start = int(match.group(1)) if match else None
+                if start != (offset or 0):
+                    raise RuntimeError(f"Unexpected Content-Range for {url}")
+                total = int(match.group(3))
+            elif offset is not None:
+                raise RuntimeError(f"Server ignored range request for {url}")
+
+            with open(dest_path, 'wb' if offset is None else 'r+b') as f:
+                if offset is not None:
+                    f.seek(offset)
+                shutil.copyfileobj(response, f, COPY_BUFFER_SIZE)
+                written = f.tell() - (offset or 0)
+        return written, total, self._fingerprint(response)
+
+    def _download_chunks(self, url: str, dest_path: Path, start: int, total: int,
+                         fingerprint: Optional[str]) -> None:
+        """Download bytes start..total of a file in parallel range requests"""
+        part_size = -(-(total - start) // CHUNK_PARTS)
+        ranges = [(a, min(a + part_size, total) - 1) for a in range(start, total, part_size)]
+        with open(dest_path, 'r+b') as f:
+            f.truncate(total)
+
+        headers = {'User-Agent': USER_AGENT}
+        if fingerprint and not fingerprint.startswith('W/'):
+            # Only accept the ranges if the file is unchanged (needs a strong validator)
+            headers['If-Range'] = fingerprint
+
+        def download(first: int, last: int) -> None:
+            written, _, _ = self._download_range(
+                url, dest_path, {**headers, 'Range': f"bytes={first}-{last}"}, offset=first)
+            if written != last - first + 1:
+                raise RuntimeError(f"Incomplete range {first}-{last} for {url}")
+
+        executor = self._get_chunk_executor()
+        futures = [executor.submit(download, first, last) for first, last in ranges]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            # Don't leave ranges writing to a file that is about to be rewritten
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+    def cleanup(self):
+        """Stop the range request workers"""
+        if self._chunk_executor is not None:
+            self._chunk_executor.shutdown()
+            self._chunk_executor = None
+        super().cleanup()
 
 
 class TarballCache:
-    """Cache for downloaded tarballs to avoid re-downloading"""
+    """
+    Cache of files extracted from downloaded tarballs to avoid re-downloading
+
+    Tarballs are read as a stream, so instead of keeping the TarFile around
+    the files needed from each package are extracted in a single pass.
+    """
 
     def __init__(self):
-        self._cache: Dict[str, tarfile.TarFile] = {}
-        self._temp_files: List[tempfile.SpooledTemporaryFile] = []
-
-    def get_or_download(self, key: str, download_func) -> tarfile.TarFile:
-        """Get tarball from cache or download it"""
-        if key not in self._cache:
-            tarball_bytes = download_func()
-            # Create a temporary file-like object
-            temp_file = io.BytesIO(tarball_bytes)
-            self._cache[key] = tarfile.open(fileobj=temp_file, mode='r:gz')
-        return self._cache[key]
+        # {package@version: ({file_path: extracted content}, searched file paths)}
+        self._cache: Dict[str, Tuple[Dict[str, IO[bytes]], frozenset]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def copy_file(self, key: str, file_path: str, wanted: set, extract_func,
+                  dest: IO[bytes]) -> Optional[int]:
+        """
+        Copy a file extracted from a tarball to dest, downloading it if needed
+
+        extract_func(paths) must return the contents of the paths found in
+        the tarball, as file objects. It is called again only if file_path was not
+        searched yet. Returns the size of the file, or None if it is not in
+        the tarball.
+        """
+        # Only one thread downloads a given tarball, the others wait for it.
+        # The lock also guards the position of the extracted files while copying.
+        with self._key_lock(key):
+            cached = self._cache.get(key)
+            if cached is None or file_path not in cached[1]:
+                paths = frozenset(wanted | {file_path})
+                if cached is not None:
+                    self._close(cached[0])
+                cached = self._cache[key] = (extract_func(paths), paths)
+
+            spool = cached[0].get(file_path)
+            if spool is None:
+                return None
+            spool.seek(0)
+            return copy_file_data(spool, dest)
+
+    @staticmethod
+    def _close(files: Dict[str, IO[bytes]]) -> None:
+        for spool in files.values():
+            spool.close()
+
+    def has(self, key: str) -> bool:
+        """Check whether files were already extracted from a tarball"""
+        return key in self._cache
 
     def cleanup(self):
-        """Close all cached tarballs"""
-        for tf in self._cache.values():
-            try:
-                tf.close()
-            except Exception:
-                pass
+        """Drop all extracted files"""
+        for files, _ in self._cache.values():
+            self._close(files)
         self._cache.clear()
 
 
@@ -325,46 +815,148 @@ class NpmRegistry(RegistryStrategy):
     2. Get tarball URL from metadata.dist.tarball
     3. Download and extract the tarball
     4. Get files from inside package/ directory within the tarball
+
+    Metadata and tarballs are also cached on disk (see CACHE_DIR), so later
+    runs, even from other projects, don't download them again. With refresh,
+    the disk cache is not read, only updated.
+
+    If a CDN registry is given, files are first fetched from it, and the
+    tarball is only downloaded for packages the CDN doesn't have. Warnings
+    are printed with log, so they don't garble a progress display.
     """
 
-    def __init__(self, registry_url: str, timeout: int = 30):
-        super().__init__(registry_url, timeout)
+    def __init__(self, registry_url: str, timeout: int = 30, cache_dir: Optional[Path] = CACHE_DIR,
+                 cdn: Optional[JsDelivrRegistry] = None, pool: Optional[ConnectionPool] = None,
+                 log: Callable[[str], None] = print, refresh: bool = False):
+        super().__init__(registry_url, timeout, pool=pool)
+        self._log = log
+        self._refresh = refresh
+        self._cdn = cdn
+        self._cdn_disabled = threading.Event()
+        # {package@version: whether the CDN serves it}, for missing optional files
+        self._cdn_has_package: Dict[str, bool] = {}
+        self._optional_files: Dict[str, set] = {}
         self._metadata_cache: Dict[str, Dict] = {}
+        self._metadata_locks: Dict[str, threading.Lock] = {}
+        self._metadata_locks_lock = threading.Lock()
+        self._tarball_url_cache: Dict[Tuple[str, str], str] = {}
         self._tarball_cache = TarballCache()
+        self._wanted_files: Dict[str, set] = {}
+        self._sample_files: Dict[str, List[str]] = {}
 
-    def _encode_package_name(self, package_name: str) -> str:
-        """
-        Encode package name for npm registry URL.
-
-        Scoped packages like @duckdb/duckdb-wasm need special handling:
-        @duckdb/duckdb-wasm -> @duckdb%2Fduckdb-wasm
-        """
-        if package_name.startswith('@') and '/' in package_name:
-            # Scoped package: encode the slash
-            scope, name = package_name.split('/', 1)
-            return f"{scope}%2F{name}"
-        return package_name
+        # Metadata holds registry-specific tarball URLs, so it's cached per registry host
+        registry_host = urllib.parse.urlsplit(self.registry_url).netloc.replace(':', '_')
+        self._metadata_dir = self._tarballs_dir = None
+        if cache_dir is not None:
+            try:
+                self._metadata_dir = cache_dir / 'meta' / registry_host
+                self._tarballs_dir = cache_dir / 'tarballs'
+                self._metadata_dir.mkdir(parents=True, exist_ok=True)
+                self._tarballs_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                self._log(f"⚠ Warning: Disk cache disabled, cannot create {cache_dir}: {e}")
+                self._metadata_dir = self._tarballs_dir = None
+
+    def _metadata_lock(self, cache_key: str) -> threading.Lock:
+        with self._metadata_locks_lock:
+            if cache_key not in self._metadata_locks:
+                self._metadata_locks[cache_key] = threading.Lock()
+            return self._metadata_locks[cache_key]
 
     def _fetch_metadata(self, package_name: str, version: str) -> Dict:
-        """Fetch package metadata from registry"""
+        """Fetch package metadata from registry, once per package"""
         cache_key = f"{package_name}@{version}"
+        metadata = self._metadata_cache.get(cache_key)
+        if metadata is None:
+            # All files of a package need its metadata, only the first thread
+            # fetches it and the others wait for it
+            with self._metadata_lock(cache_key):
+                metadata = self._metadata_cache.get(cache_key)
+                if metadata is None:
+                    metadata = self._metadata_cache[cache_key] = self._load_metadata(
+                        package_name, version
+                    )
+        return metadata
+
+    def _load_metadata(self, package_name: str, version: str) -> Dict:
+        """Load package metadata from the disk cache, or download it"""
+        encoded_name = encode_package_name(package_name)
+        cache_file = None
+        if self._metadata_dir is not None:
+            cache_file = self._metadata_dir / f"{encoded_name}@{version}.json"
+            if not self._refresh:
+                metadata = self._read_cached_metadata(cache_file, version)
+                if metadata is not None:
+                    return metadata
 
-        if cache_key in self._metadata_cache:
-            return self._metadata_cache[cache_key]
-
-        encoded_name = self._encode_package_name(package_name)
         url = f"{self.registry_url}/{encoded_name}/{version}"
 
         try:
-            content = self._make_request(url, headers={'Accept': 'application/json'})
-            metadata = json.loads(content.decode('utf-8'))
-            self._metadata_cache[cache_key] = metadata
-            return metadata
+            # Prefer the abbreviated metadata format (only what installs need), in
+            # case the registry answers with the full document of the package
+            content = self._make_request(url, headers={
+                'Accept': 'application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8'
+            })
+            metadata = json.loads(content)
         except Exception as e:
             raise RuntimeError(f"Failed to fetch metadata for {package_name}@{version}: {e}")
 
+        if cache_file is not None:
+            try:
+                write_json_atomic(cache_file, metadata)
+            except OSError:
+                pass
+        return metadata
+
+    @staticmethod
+    def _read_cached_metadata(cache_file: Path, version: str) -> Optional[Dict]:
+        """Read metadata from the disk cache, if present and still valid"""
+        try:
+            if not EXACT_VERSION_RE.match(version):
+                if time.time() - cache_file.stat().st_mtime > METADATA_TTL:
+                    return None
+            with open(cache_file, 'rb') as f:
+                metadata = json.load(f)
+            return metadata if isinstance(metadata, dict) else None
+        except (OSError, ValueError):
+            return None
+
+    def _cached_tarball(self, tarball_url: str) -> Optional[Path]:
+        """Get the path of a tarball in the disk cache, if present"""
+        if self._tarballs_dir is None or self._refresh:
+            return None
+        try:
+            with open(self._tarballs_dir / 'index.json') as f:
+                sha256 = json.load(f).get(tarball_url)
+        except (OSError, ValueError, AttributeError):
+            return None
+        if not sha256:
+            return None
+        path = self._tarballs_dir / f"{sha256}.tgz"
+        return path if path.exists() else None
+
+    def _store_tarball(self, tarball_url: str, temp_path: str, sha256: str) -> None:
+        """Move a downloaded tarball into the disk cache and index it by URL"""
+        os.replace(temp_path, self._tarballs_dir / f"{sha256}.tgz")
+        index_path = self._tarballs_dir / 'index.json'
+        with _TARBALL_INDEX_LOCK:
+            try:
+                with open(index_path) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            index[tarball_url] = sha256
+            write_json_atomic(index_path, index)
+
     def _get_tarball_url(self, package_name: str, version: str) -> str:
         """Get tarball URL from package metadata"""
+        key = (package_name, version)
+        url = self._tarball_url_cache.get(key)
+        if url is None:
+            url = self._tarball_url_cache[key] = self._build_tarball_url(package_name, version)
+        return url
+
+    def _build_tarball_url(self, package_name: str, version: str) -> str:
         metadata = self._fetch_metadata(package_name, version)
 
         # Try to get tarball URL from metadata
@@ -372,7 +964,7 @@ class NpmRegistry(RegistryStrategy):
             return metadata['dist']['tarball']
 
         # Fallback: construct URL
-        encoded_name = self._encode_package_name(package_name)
+        encoded_name = encode_package_name(package_name)
         # Standard npm tarball URL pattern
         if package_name.startswith('@'):
             # Scoped package: @scope/name -> @scope/name/-/name-version.tgz
@@ -381,38 +973,209 @@ class NpmRegistry(RegistryStrategy):
         else:
             return f"{self.registry_url}/{encoded_name}/-/{package_name}-{version}.tgz"
 
-    def _download_tarball(self, package_name: str, version: str) -> tarfile.TarFile:
-        """Download and cache tarball for a package"""
-        cache_key = f"{package_name}@{version}"
+    def extract_files(self, package_name: str, version: str,
+                      needed_paths: frozenset) -> Dict[str, IO[bytes]]:
+        """
+        Extract the given files from the tarball of a package
 
-        def download():
-            tarball_url = self._get_tarball_url(package_name, version)
-            return self._make_request(tarball_url)
+        Members are visited once, in archive order, stopping as soon as every
+        needed file has been found. The tarball is read from the disk cache
+        when possible, otherwise it is downloaded, checked against the
+        integrity in the package metadata and saved to the cache.
+        """
+        tarball_url = self._get_tarball_url(package_name, version)
+
+        cached_path = self._cached_tarball(tarball_url)
+        if cached_path is not None:
+            with open(cached_path, 'rb') as f:
+                if hasattr(os, 'posix_fadvise'):
+                    # Let the kernel read ahead, the tarball is read once from start to end
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                files, sample = self._read_tarball(f, needed_paths)
+        else:
+            # Stream the download straight into tarfile, so extraction overlaps
+            # with the download and the tarball isn't kept in memory
+            with self._pool.stream('GET', tarball_url, headers={'User-Agent': USER_AGENT},
+                                   timeout=self.timeout, retries=self.retries) as response:
+                integrity = parse_integrity(
+                    self._fetch_metadata(package_name, version).get('dist', {})
+                )
+                files, sample = self._read_and_store_tarball(tarball_url, response,
+                                                             needed_paths, integrity)
+
+        self._sample_files[f"{package_name}@{version}"] = sample
+        return files
+
+    def _read_and_store_tarball(self, tarball_url: str, response, needed_paths: frozenset,
+                                integrity: Optional[Tuple[str, bytes]]
+                                ) -> Tuple[Dict[str, IO[bytes]], List[str]]:
+        """
+        Extract files from a downloading tarball while saving it to the disk cache
 
-        return self._tarball_cache.get_or_download(cache_key, download)
+        Nothing is returned or cached unless the whole tarball matches
+        integrity. Without a disk cache, the tarball is still read to the end
+        to check it.
+        """
+        temp_file = None
+        if self._tarballs_dir is not None:
+            temp_file = tempfile.NamedTemporaryFile(dir=self._tarballs_dir, suffix='.part',
+                                                    delete=False)
+        try:
+            tee = TeeReader(response, temp_file, integrity)
+            result = self._read_tarball(tee, needed_paths)
+            # Read the rest of the tarball, to check it and complete the cached copy
+            tee.drain()
+            if not tee.matches():
+                raise RuntimeError(f"Integrity check failed for {tarball_url}")
+        except BaseException:
+            if temp_file is not None:
+                temp_file.close()
+                os.unlink(temp_file.name)
+            raise
+        if temp_file is not None:
+            temp_file.close()
+            self._store_tarball(tarball_url, temp_file.name, tee.sha256.hexdigest())
+        return result
 
-    def get_file(self, package_name: str, version: str, file_path: str) -> bytes:
-        """Extract file from package tarball"""
-        tf = self._download_tarball(package_name, version)
+    @staticmethod
+    def _read_tarball(fileobj, needed_paths: frozenset) -> Tuple[Dict[str, IO[bytes]], List[str]]:
+        """
+        Extract the given files from a gzipped tarball stream
 
-        # npm tarballs contain files in a 'package/' directory
-        # Try with package/ prefix first, then without
-        possible_paths = [
-            f"package/{file_path}",
-            file_path,
-        ]
+        Returns the files found, in memory or in temporary files if large, and
+        the first 10 file names, for debugging.
+        """
+        # npm tarballs contain files in a 'package/' directory,
+        # but also accept files without the prefix
+        remaining = {f"package/{path}": path for path in needed_paths}
+        remaining.update({path: path for path in needed_paths})
+        files: Dict[str, IO[bytes]] = {}
+        sample = []
+
+        # Streaming mode ('r|gz') never seeks, so it works on network streams
+        try:
+            with tarfile.open(fileobj=fileobj, mode='r|gz') as tf:
+                for member in tf:
+                    if not member.isfile():
+                        continue
+                    if len(sample) < 10:
+                        sample.append(member.name)
+
+                    path = remaining.pop(member.name, None)
+                    if path is None:
+                        continue
+                    remaining.pop(f"package/{path}", None)
+                    remaining.pop(path, None)
+
+                    file_obj = tf.extractfile(member)
+                    if file_obj:
+                        if member.size > SPOOL_MAX_SIZE:
+                            # A real file, so that it can be copied with sendfile()
+                            spool = files[path] = tempfile.TemporaryFile()
+                        else:
+                            spool = files[path] = io.BytesIO()
+                        shutil.copyfileobj(file_obj, spool, COPY_BUFFER_SIZE)
+                    if not remaining:
+                        break
+        except BaseException:
+            TarballCache._close(files)
+            raise
+
+        return files, sample
+
+    def prepare(self, package_name: str, version: str, file_paths: Tuple[str, ...],
+                optional_paths: Tuple[str, ...] = ()) -> None:
+        """Register the files that will be requested, so each tarball is read once"""
+        key = f"{package_name}@{version}"
+        self._wanted_files.setdefault(key, set()).update(file_paths + optional_paths)
+        self._optional_files.setdefault(key, set()).update(optional_paths)
+
+    def _tarball_fingerprint(self, package_name: str, version: str) -> Optional[str]:
+        """Get the tarball checksum from the package metadata"""
+        dist = self._fetch_metadata(package_name, version).get('dist', {})
+        return dist.get('integrity') or dist.get('shasum')
+
+    def _has_tarball(self, package_name: str, version: str) -> bool:
+        """Check whether the tarball of a package was already extracted or is cached on disk"""
+        if self._tarball_cache.has(f"{package_name}@{version}"):
+            return True
+        return self._cached_tarball(self._get_tarball_url(package_name, version)) is not None
+
+    def _get_file_from_cdn(self, package_name: str, version: str, file_path: str,
+                           dest_path: Path) -> Optional[int]:
+        """
+        Try to save a file from the CDN, returning its size
 
-        for path in possible_paths:
+        Returns None if the tarball should be used instead: the package is
+        not on the CDN (e.g. a private package), its tarball is available
+        locally anyway, or the CDN is unreachable, in which case it is not
+        tried again for the rest of the run.
+
+        A missing optional file (e.g. a source map) only falls back to the
+        tarball if the CDN doesn't serve the package at all. Otherwise the
+        file isn't in the published tarball either, and FileNotFoundError is
+        raised.
+        """
+        if self._cdn is None or self._cdn_disabled.is_set():
+            return None
+        key = f"{package_name}@{version}"
+        if self._has_tarball(package_name, version):
+            return None
+
+        try:
+            size, _ = self._cdn.get_file_to(package_name, version, file_path, dest_path)
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                self._disable_cdn(e)
+                return None
+            if file_path not in self._optional_files.get(key, ()):
+                return None
             try:
-                member = tf.getmember(path)
-                file_obj = tf.extractfile(member)
-                if file_obj:
-                    return file_obj.read()
-            except KeyError:
-                continue
+                on_cdn = self._cdn_has_package.get(key)
+                if on_cdn is None:
+                    on_cdn = self._cdn_has_package[key] = self._cdn.has_package(package_name, version)
+            except (urllib.error.URLError, OSError) as probe_error:
+                self._disable_cdn(probe_error)
+                return None
+            if on_cdn:
+                raise FileNotFoundError(f"File '{file_path}' not found in {key}")
+            return None
+        except (urllib.error.URLError, OSError, RuntimeError) as e:
+            self._disable_cdn(e)
+            return None
+        return size
+
+    def _disable_cdn(self, error: Exception) -> None:
+        if not self._cdn_disabled.is_set():
+            self._cdn_disabled.set()
+            self._log(f"⚠ Warning: {self._cdn.registry_url} unavailable, using tarballs only ({error})")
+
+    def get_file_to(self, package_name: str, version: str, file_path: str, dest_path: Path,
+                    known_fingerprint: Optional[str] = None) -> Optional[Tuple[int, Optional[str]]]:
+        """Save a file from the CDN if possible, otherwise from the package tarball"""
+        fingerprint = self._tarball_fingerprint(package_name, version)
+        if known_fingerprint and fingerprint == known_fingerprint:
+            return None
+        size = self._get_file_from_cdn(package_name, version, file_path, dest_path)
+        if size is None:
+            with open(dest_path, 'wb') as f:
+                size = self._copy_from_tarball(package_name, version, file_path, f)
+        # The CDN serves the files of the same published tarball
+        return size, fingerprint
+
+    def _copy_from_tarball(self, package_name: str, version: str, file_path: str,
+                           dest: IO[bytes]) -> int:
+        """Copy a file from the package tarball to dest, returning its size"""
+        key = f"{package_name}@{version}"
+        size = self._tarball_cache.copy_file(
+            key, file_path, self._wanted_files.get(key, set()),
+            lambda paths: self.extract_files(package_name, version, paths), dest
+        )
+        if size is not None:
+            return size
 
         # List available files for debugging
-        available = [m.name for m in tf.getmembers() if m.isfile()][:10]
+        available = self._sample_files.get(key, [])
         raise FileNotFoundError(
             f"File '{file_path}' not found in tarball for {package_name}@{version}. "
             f"Available files (first 10): {available}"
@@ -421,88 +1184,188 @@ class NpmRegistry(RegistryStrategy):
     def cleanup(self):
         """Clean up tarball cache"""
         self._tarball_cache.cleanup()
+        if self._cdn is not None:
+            self._cdn.cleanup()
+        super().cleanup()
 
 
-def create_registry(registry_url: str, registry_type: RegistryType, timeout: int = 30) -> RegistryStrategy:
-    """Factory function to create the appropriate registry strategy"""
+def create_registry(registry_url: str, registry_type: RegistryType, timeout: int = 30,
+                    cdn_fallback: bool = True, pool: Optional[ConnectionPool] = None,
+                    log: Callable[[str], None] = print,
+                    refresh: bool = False) -> RegistryStrategy:
+    """
+    Factory function to create the appropriate registry strategy
+
+    npm registries get the public CDN as a shortcut for single files, unless
+    cdn_fallback is False (e.g. when only the private registry is reachable).
+    All registries send their requests through pool, if given, and print
+    their warnings while downloading with log. With refresh, npm registries
+    download metadata and tarballs again instead of using the disk cache.
+    """
     if registry_type == RegistryType.AUTO:
         registry_type = detect_registry_type(registry_url)
         print(f"Auto-detected registry type: {registry_type.value}")
 
     if registry_type == RegistryType.JSDELIVR:
-        return JsDelivrRegistry(registry_url, timeout)
+        return JsDelivrRegistry(registry_url, timeout, pool=pool)
     else:
-        return NpmRegistry(registry_url, timeout)
+        cdn = None
+        if cdn_fallback:
+            # No retries: an unreachable CDN only delays the tarball downloads
+            cdn = JsDelivrRegistry(PUBLIC_CDN_URL, min(timeout, PUBLIC_CDN_TIMEOUT),
+                                   retries=0, pool=pool)
+        return NpmRegistry(registry_url, timeout, cdn=cdn, pool=pool, log=log, refresh=refresh)
+
+
+# Line shapes understood by parse_yaml_simple
+_RE_SKIP = re.compile(r'^\s*(?:#.*)?$')
+_RE_LIST_KV = re.compile(r'^(\s*)-\s+([^:\s][^:]*?):(?:\s+(.*?))?\s*$')
+_RE_LIST_ITEM = re.compile(r'^(\s*)-(?:\s+(.*?))?\s*$')
+_RE_KV = re.compile(r'^(\s*)([^:\s][^:]*?):(?:\s+(.*?))?\s*$')
+# A quoted scalar, maybe followed by a comment (a '#' inside the quotes is kept)
+_QUOTE_RE = re.compile(r'^(["\'])(.*?)\1(?:\s+#.*)?$')
+
+
+def _yaml_scalar(value: Optional[str]) -> Optional[str]:
+    """Convert a scalar to a string, removing quotes and a trailing comment"""
+    if not value:
+        return None
+    match = _QUOTE_RE.match(value)
+    if match:
+        return match.group(2)
+    return value.split(' #', 1)[0].rstrip()
 
 
 def parse_yaml_simple(content: str) -> Dict[str, Any]:
     """
     Simple YAML parser for _quarto.yml - handles basic nested structures.
-    Only parses what we need for ojs-offline configuration.
-    """
-    result = {}
-    lines = content.split('\n')
-    current_section = None
-    current_lib = None
-    current_list_key = None
-    indent_stack = [(0, result)]
-
-    for line in lines:
-        # Skip empty lines and comments
-        stripped = line.strip()
-        if not stripped or stripped.startswith('#'):
+    Only parses what we need for ojs-offline configuration: nested mappings,
+    lists of scalars and lists of mappings. All scalars are strings.
+    """
+    result: Dict[str, Any] = {}
+    # (indentation of the entries, container) from the root to the innermost block
+    stack: List[Tuple[int, Any]] = [(0, result)]
+    # Mapping, key and indentation of a key whose value is a block (list or mapping)
+    pending = None
+
+    for line in content.splitlines():
+        if _RE_SKIP.match(line):
             continue
 
-        # Calculate indentation
-        indent = len(line) - len(line.lstrip())
-
-        # Handle list items
-        if stripped.startswith('- '):
-            item_content = stripped[2:].strip()
-            if ':' in item_content:
-                # It's a dict item like "- name: value"
-                key, value = item_content.split(':', 1)
-                key = key.strip()
-                value = value.strip().strip('"').strip("'")
-                if current_list_key and isinstance(indent_stack[-1][1], list):
-                    if not indent_stack[-1][1] or not isinstance(indent_stack[-1][1][-1], dict):
-                        indent_stack[-1][1].append({})
-                    indent_stack[-1][1][-1][key] = value
-            else:
-                # Simple list item
-                item = item_content.strip('"').strip("'")
-                if isinstance(indent_stack[-1][1], list):
-                    indent_stack[-1][1].append(item)
+        match = _RE_LIST_KV.match(line) or _RE_LIST_ITEM.match(line)
+        is_list_item = match is not None
+        if not is_list_item:
+            match = _RE_KV.match(line)
+            if not match:
+                continue
+        indent = len(match.group(1))
+
+        # Open the block of the previous key if this line is its first entry
+        if pending:
+            parent, key, key_indent = pending
+            pending = None
+            if is_list_item and indent >= key_indent:
+                parent[key] = []
+                stack.append((indent, parent[key]))
+            elif not is_list_item and indent > key_indent:
+                parent[key] = {}
+                stack.append((indent, parent[key]))
+
+        # Close the blocks this line is not part of
+        while len(stack) > 1 and (indent < stack[-1][0] or (
+                indent == stack[-1][0] and isinstance(stack[-1][1], list) != is_list_item)):
+            stack.pop()
+
+        container = stack[-1][1]
+        if is_list_item != isinstance(container, list):
+            continue  # Malformed line, e.g. a list item inside a mapping
+
+        if is_list_item and match.re is _RE_LIST_KV:
+            # "- key: value" starts a mapping whose keys are aligned with "key"
+            item: Dict[str, Any] = {}
+            container.append(item)
+            stack.append((match.start(2), item))
+            container, indent = item, match.start(2)
+        elif is_list_item:
+            container.append(_yaml_scalar(match.group(2)))
             continue
 
-        # Handle key: value pairs
-        if ':' in stripped:
-            key, value = stripped.split(':', 1)
-            key = key.strip()
-            value = value.strip()
+        key = _yaml_scalar(match.group(2))
+        value = _yaml_scalar(match.group(3))
+        container[key] = value
+        if value is None:
+            pending = (container, key, indent)
 
-            # Pop stack to correct level
-            while len(indent_stack) > 1 and indent <= indent_stack[-1][0]:
-                indent_stack.pop()
+    return result
 
-            current_dict = indent_stack[-1][1]
-            if not isinstance(current_dict, dict):
-                continue
 
-            if value:
-                # Simple key: value
-                current_dict[key] = value.strip('"').strip("'")
-            else:
-                # Could be start of a list or nested dict
-                # Check next line to determine
-                current_dict[key] = {}
-                indent_stack.append((indent + 2, current_dict[key]))
-                current_list_key = key
+def _import_yaml():
+    """
+    Import PyYAML if available, or return None to use the simple parser.
 
-    return result
+    The import is deferred because most projects have no custom libraries
+    and PyYAML is slow to import.
+    """
+    global _yaml_module
+    if _yaml_module is None:
+        try:
+            import yaml
+            _yaml_module = yaml
+        except ImportError:
+            _yaml_module = False
+    return _yaml_module or None
+
+
+# Start of the ojs-offline section, and of any other top-level key
+_RE_OJS_SECTION = re.compile(r'^["\']?ojs-offline["\']?:[ \t]*(?:#.*)?$', re.MULTILINE)
+_RE_TOP_LEVEL_LINE = re.compile(r'^[^\s#]', re.MULTILINE)
 
 
-def load_custom_libraries(quarto_yml_path: Path) -> Dict[str, Dict]:
+def parse_ojs_offline_section(content: str) -> List[Package]:
+    """
+    Parse the custom libraries declared in the ojs-offline section of _quarto.yml
+
+    Invalid entries are skipped with a warning.
+    """
+    yaml = _import_yaml()
+    if yaml:
+        config = yaml.safe_load(content)
+    else:
+        # Use simple parser as fallback, on the ojs-offline section only
+        match = _RE_OJS_SECTION.search(content)
+        if not match:
+            return []
+        end = _RE_TOP_LEVEL_LINE.search(content, match.end())
+        config = parse_yaml_simple(content[match.start():end.start() if end else len(content)])
+
+    ojs_config = config.get('ojs-offline') if isinstance(config, dict) else None
+    libraries = ojs_config.get('libraries') if isinstance(ojs_config, dict) else None
+    if not isinstance(libraries, list):
+        return []
+
+    packages = []
+    for lib in libraries:
+        if not isinstance(lib, dict):
+            continue
+
+        name = lib.get('name')
+        version = lib.get('version')
+        files = lib.get('files')
+        optional_files = lib.get('optional_files') or []
+
+        if not name or not version or not files:
+            print(f"⚠ Skipping invalid library entry: {lib}")
+            continue
+
+        packages.append(Package(
+            str(name), str(version),
+            tuple(files) if isinstance(files, list) else (files,),
+            tuple(optional_files) if isinstance(optional_files, list) else (optional_files,)
+        ))
+    return packages
+
+
+def load_custom_libraries(quarto_yml_path: Path) -> Dict[str, Package]:
     """
     Load additional libraries from _quarto.yml
 
@@ -523,42 +1386,11 @@ def load_custom_libraries(quarto_yml_path: Path) -> Dict[str, Dict]:
         with open(quarto_yml_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        if HAS_YAML:
-            config = yaml.safe_load(content)
-        else:
-            # Use simple parser as fallback
-            config = parse_yaml_simple(content)
-
-        if not config:
-            return {}
-
-        ojs_config = config.get('ojs-offline', {})
-        if not isinstance(ojs_config, dict):
-            return {}
-
-        libraries = ojs_config.get('libraries', [])
-        if not isinstance(libraries, list):
+        # Nothing to parse without an ojs-offline section
+        if 'ojs-offline' not in content:
             return {}
 
-        result = {}
-        for lib in libraries:
-            if not isinstance(lib, dict):
-                continue
-
-            name = lib.get('name')
-            version = lib.get('version')
-            files = lib.get('files', [])
-
-            if not name or not version or not files:
-                print(f"⚠ Skipping invalid library entry: {lib}")
-                continue
-
-            result[name] = {
-                'version': version,
-                'files': files if isinstance(files, list) else [files],
-                'optional_files': lib.get('optional_files', [])
-            }
-
+        result = {pkg.name: pkg for pkg in parse_ojs_offline_section(content)}
         if result:
             print(f"📋 Found {len(result)} custom libraries in _quarto.yml")
 
@@ -600,124 +1432,507 @@ def validate_registry_url(url: str) -> bool:
         return False
 
 
+class ProgressReporter:
+    """
+    Prints download progress from a single background thread
+
+    Download workers only push messages to a queue, so they never contend on
+    stdout. On a terminal, progress is shown on a single status line that is
+    rewritten in place and only problems are printed in full; otherwise (e.g.
+    in CI logs) every message is printed on its own line.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.is_tty = self.stream.isatty()
+        self.done = 0
+        self.total = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, total: int) -> None:
+        """Start reporting the progress of total files"""
+        self.done = 0
+        self.total = total
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Print pending messages and stop the reporter thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def log(self, message: str) -> None:
+        """Print a message on its own line"""
+        self._put((None, message, True))
+
+    def file_done(self, file_id: str, message: Optional[str], ok: bool = True) -> None:
+        """Count one more file as processed, with the message describing it"""
+        self._put((file_id, message, not ok))
+
+    def _put(self, item: Tuple[Optional[str], Optional[str], bool]) -> None:
+        if self._thread is None:
+            self._write([item])
+        else:
+            self._queue.put(item)
+
+    def _run(self) -> None:
+        while True:
+            # Write everything queued in the meantime at once
+            items = [self._queue.get()]
+            while not self._queue.empty():
+                items.append(self._queue.get())
+            stop = None in items
+            self._write([item for item in items if item is not None], final=stop)
+            if stop:
+                return
+
+    def _write(self, items: List[Tuple[Optional[str], Optional[str], bool]],
+               final: bool = False) -> None:
+        output = []
+        current = None
+        for file_id, message, important in items:
+            if file_id is not None:
+                self.done += 1
+                current = file_id
+            if message is not None and (important or not self.is_tty):
+                output.append(f"\r\x1b[K{message}\n" if self.is_tty else f"{message}\n")
+
+        if self.is_tty and self.total:
+            if final:
+                output.append(f"\r\x1b[KDownloaded {self.done}/{self.total} files\n")
+            elif current is not None or output:
+                status = f"Downloading {self.done}/{self.total} ({current or '...'})"
+                # Longer lines would wrap and could not be rewritten in place
+                width = shutil.get_terminal_size().columns - 1
+                output.append(f"\r\x1b[K{status[:width]}")
+
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+
+
+class RichProgressReporter:
+    """
+    Shows download progress with a rich progress bar
+
+    Same interface as ProgressReporter. rich's Progress refreshes the bar
+    from its own thread and is safe to update from the download workers.
+    """
+
+    def __init__(self, progress_class, escape):
+        self._progress_class = progress_class
+        self._escape = escape
+        self._progress = None
+        self._task = None
+
+    def start(self, total: int) -> None:
+        """Start reporting the progress of total files"""
+        self._progress = self._progress_class()
+        self._progress.start()
+        self._task = self._progress.add_task("Downloading", total=total)
+
+    def stop(self) -> None:
+        """Stop the progress bar, leaving it in its final state"""
+        if self._progress is not None:
+            self._progress.stop()
+            self._progress = None
+
+    def log(self, message: str) -> None:
+        """Print a message on its own line"""
+        if self._progress is None:
+            print(message)
+        else:
+            self._progress.console.print(message, markup=False, highlight=False)
+
+    def file_done(self, file_id: str, message: Optional[str], ok: bool = True) -> None:
+        """Count one more file as processed, printing the message of failures"""
+        if self._progress is None:
+            if message is not None:
+                print(message)
+            return
+        if message is not None and not ok:
+            self._progress.console.print(message, markup=False, highlight=False)
+        self._progress.update(self._task, advance=1, description=self._escape(file_id))
+
+
+def create_progress_reporter():
+    """
+    Get a progress reporter for stdout
+
+    On a terminal, a rich progress bar is used if rich is installed. It is
+    imported only then, since it is slow to import.
+    """
+    if sys.stdout.isatty():
+        try:
+            from rich.markup import escape
+            from rich.progress import Progress
+        except ImportError:
+            pass
+        else:
+            return RichProgressReporter(Progress, escape)
+    return ProgressReporter()
+
+
 class DependencyDownloader:
     def __init__(self, base_dir: Path, registry_url: str = None, timeout: int = 30,
-                 dependencies: Dict = None, registry_type: RegistryType = RegistryType.AUTO):
+                 dependencies: Tuple[Package, ...] = None,
+                 registry_type: RegistryType = RegistryType.AUTO,
+                 jobs: int = DEFAULT_JOBS, force: bool = False,
+                 cdn_fallback: bool = True,
+                 mirrors: Tuple[Tuple[str, RegistryType], ...] = ()):
         self.base_dir = base_dir
         self.libs_dir = base_dir / "resources" / "libs"
+        self.cache_manifest_path = base_dir / "resources" / ".download-cache.json"
         self.dependency_map = {}
+        # Files downloaded (or up to date), from which the map is built
+        self.successes: List[DownloadTask] = []
         self.failed_downloads = []
         self.failed_optional = []
+        self.total_bytes = 0
+        self.file_count = 0
 
         # Use provided dependencies or default
         self.dependencies = dependencies or DEPENDENCIES
 
         # Use custom registry or default
         self.registry_url = registry_url or "https://cdn.jsdelivr.net/npm"
+        self.mirrors = tuple(mirrors)
         self.timeout = timeout
+        self.jobs = max(1, jobs)
+        self.force = force
+
+        # Fingerprints of previously downloaded files, to skip unchanged ones
+        self.cache_manifest = {} if force else self.load_cache_manifest()
+        # Sizes of the files already in libs_dir, scanned once before downloading
+        self._present: Dict[Path, int] = {}
+
+        # Guards state shared between download workers
+        self._lock = threading.Lock()
+        self.reporter = create_progress_reporter()
+        # Downloads started so far, so that a file requested twice is only fetched once
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
 
         # Validate registry URL
         if not validate_registry_url(self.registry_url):
             print(f"⚠ Warning: Proceeding with potentially invalid registry URL")
 
-        # Create registry strategy
-        self.registry = create_registry(self.registry_url, registry_type, timeout)
+        # Create registry strategy, with one connection pool for all its requests,
+        # which also caps the connections to each host
+        self.http = ConnectionPool(timeout, max_per_host=min(self.jobs, MAX_CONNECTIONS_PER_HOST))
+        self.registry = create_registry(self.registry_url, registry_type, timeout,
+                                        cdn_fallback, pool=self.http, log=self.reporter.log,
+                                        refresh=force)
+        # Packages are spread over the registry and its mirrors, each host
+        # getting its own share of concurrent connections. Mirrors don't
+        # inherit registry_type, they may be of another kind than the registry.
+        self.registries = [self.registry] + [
+            create_registry(mirror, mirror_type, timeout, cdn_fallback, pool=self.http,
+                            log=self.reporter.log, refresh=force)
+            for mirror, mirror_type in self.mirrors
+        ]
 
+    def _record_failure(self, file_id: str, error: Exception, optional: bool) -> None:
+        """Record a failed download"""
+        with self._lock:
+            if optional:
+                self.failed_optional.append((file_id, str(error)))
+            else:
+                self.failed_downloads.append((file_id, str(error)))
 
-    def download_file(self, name: str, version: str, file_path: str,
-                       local_path: Path, optional: bool = False) -> bool:
-        """Download a file using the registry strategy"""
+    def load_cache_manifest(self) -> Dict[str, Dict]:
+        """Load fingerprints of files downloaded by previous runs"""
         try:
-            print(f"  Downloading: {name}@{version}/{file_path}")
-            local_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_manifest_path) as f:
+                manifest = json.load(f)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
 
-            # Use registry strategy to get file content
-            content = self.registry.get_file(name, version, file_path)
+    def save_cache_manifest(self) -> None:
+        """Save fingerprints of downloaded files for the next run"""
+        write_json_atomic(self.cache_manifest_path, self.cache_manifest)
 
-            with open(local_path, 'wb') as f:
-                f.write(content)
+    def scan_libs_dir(self) -> Dict[Path, int]:
+        """List the files in libs_dir with their sizes, in a single directory walk"""
+        present = {}
+        pending = [self.libs_dir]
+        while pending:
+            try:
+                with os.scandir(pending.pop()) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file():
+                            present[Path(entry.path)] = entry.stat().st_size
+            except OSError:
+                continue
+        return present
+
+    def check_local_copy(self, file_id: str, local_path: Path) -> Tuple[bool, Optional[str]]:
+        """
+        Check the local copy of a file against the manifest
+
+        Returns whether the copy is intact (same size and SHA-256 as when it
+        was downloaded), and its remote fingerprint if it may be reused.
+        """
+        cached = self.cache_manifest.get(file_id)
+        if not cached or 'sha256' not in cached:
+            return False, None
+        if self._present.get(local_path) != cached.get('size'):
+            return False, None
+        if file_sha256(local_path) != cached['sha256']:
+            return False, None
+        return True, cached.get('fingerprint')
+
+    def _count_cached(self, file_id: str) -> bool:
+        with self._lock:
+            self.total_bytes += self.cache_manifest[file_id]['size']
+            self.file_count += 1
+        self.reporter.file_done(file_id, f"  ✓ {file_id} (cached)")
+        return True
+
+    def download_file(self, name: str, version: str, file_path: str,
+                       local_path: Path, optional: bool = False,
+                       registry: Optional[RegistryStrategy] = None) -> bool:
+        """
+        Download a file using the registry strategy
+
+        Concurrent or repeated requests for the same file share the result
+        of the first one instead of downloading it again.
+        """
+        file_id = f"{name}@{version}/{file_path}"
+        with self._inflight_lock:
+            future = self._inflight.get(file_id)
+            is_first = future is None
+            if is_first:
+                future = self._inflight[file_id] = Future()
+
+        if not is_first:
+            result = future.result()
+            self.reporter.file_done(file_id, None)
+            return result
 
-            file_size = len(content) / 1024  # KB
-            print(f"    ✓ Saved to: {local_path.relative_to(self.base_dir)} ({file_size:.1f} KB)")
+        try:
+            result = self._download_file(name, version, file_path, local_path, optional,
+                                         registry or self.registry)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
+
+    def _download_file(self, name: str, version: str, file_path: str,
+                       local_path: Path, optional: bool, registry: RegistryStrategy) -> bool:
+        file_id = f"{name}@{version}/{file_path}"
+        try:
+            intact, known_fingerprint = False, None
+            if not self.force:
+                intact, known_fingerprint = self.check_local_copy(file_id, local_path)
+            if intact and EXACT_VERSION_RE.match(version):
+                # Published versions never change, no need to ask the registry
+                return self._count_cached(file_id)
+
+            result = self._fetch_file(name, version, file_path, local_path, optional,
+                                      registry, known_fingerprint)
+            if result is None:
+                # The local copy is up to date
+                return self._count_cached(file_id)
+            size, fingerprint, sha256 = result
+
+            with self._lock:
+                self.total_bytes += size
+                self.file_count += 1
+                self._present[local_path] = size
+                self.cache_manifest[file_id] = {'fingerprint': fingerprint, 'size': size,
+                                                'sha256': sha256}
+
+            file_size = size / 1024  # KB
+            self.reporter.file_done(file_id, f"  ✓ {file_id} -> {local_path.relative_to(self.base_dir)} ({file_size:.1f} KB)")
             return True
 
         except urllib.error.HTTPError as e:
             if optional:
-                print(f"    ⊘ Optional file not found (skipping)")
-                self.failed_optional.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ⊘ {file_id}: optional file not found (skipping)")
             else:
-                print(f"    ✗ HTTP Error {e.code}: {e.reason}")
-                self.failed_downloads.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ✗ {file_id}: HTTP Error {e.code}: {e.reason}", ok=False)
+            self._record_failure(file_id, e, optional)
             return False
         except urllib.error.URLError as e:
             if optional:
-                print(f"    ⊘ Optional file unavailable (skipping)")
-                self.failed_optional.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ⊘ {file_id}: optional file unavailable (skipping)")
             else:
-                print(f"    ✗ URL Error: {e.reason}")
-                self.failed_downloads.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ✗ {file_id}: URL Error: {e.reason}", ok=False)
+            self._record_failure(file_id, e, optional)
             return False
         except FileNotFoundError as e:
             if optional:
-                print(f"    ⊘ Optional file not found in tarball (skipping)")
-                self.failed_optional.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ⊘ {file_id}: optional file not found in package (skipping)")
             else:
-                print(f"    ✗ File not found: {e}")
-                self.failed_downloads.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ✗ {file_id}: File not found: {e}", ok=False)
+            self._record_failure(file_id, e, optional)
             return False
         except Exception as e:
             if optional:
-                print(f"    ⊘ Optional file error (skipping)")
-                self.failed_optional.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ⊘ {file_id}: optional file error (skipping)")
             else:
-                print(f"    ✗ Error: {e}")
-                self.failed_downloads.append((f"{name}@{version}/{file_path}", str(e)))
+                self.reporter.file_done(file_id, f"  ✗ {file_id}: Error: {e}", ok=False)
+            self._record_failure(file_id, e, optional)
             return False
 
-    def download_package(self, name: str, config: Dict) -> None:
-        """Download all files for a package"""
-        version = config["version"]
-        files = config.get("files", [])
-        optional_files = config.get("optional_files", [])
-
-        print(f"\n📦 {name}@{version}")
-
-        # Download required files
-        for file_path in files:
-            # Construct local path
-            local_path = self.libs_dir / f"{name}@{version}" / file_path
-
-            # Download file using registry strategy
-            if self.download_file(name, version, file_path, local_path, optional=False):
-                # Add to dependency map
-                # Map both with and without the package version for flexibility
-                map_key = f"{name}@{version}/{file_path}"
-                # Make path relative to the HTML document's libs directory
-                map_value = f"ojs-offline-libs/{name}@{version}/{file_path}"
-                self.dependency_map[map_key] = map_value
-
-                # Also add base package mapping (points to main file)
-                if file_path == files[0]:  # First file is the main entry
-                    self.dependency_map[f"{name}@{version}"] = map_value
-                    self.dependency_map[name] = map_value
-
-        # Download optional files (like source maps)
-        for file_path in optional_files:
-            local_path = self.libs_dir / f"{name}@{version}" / file_path
-
-            if self.download_file(name, version, file_path, local_path, optional=True):
-                # Add to dependency map if downloaded successfully
-                map_key = f"{name}@{version}/{file_path}"
-                map_value = f"ojs-offline-libs/{name}@{version}/{file_path}"
-                self.dependency_map[map_key] = map_value
+    def _failover_order(self, registry: RegistryStrategy) -> List[RegistryStrategy]:
+        """Get the registries to try for a file, starting with the one it is assigned to"""
+        if registry not in self.registries:
+            return [registry]
+        index = self.registries.index(registry)
+        return self.registries[index:] + self.registries[:index]
+
+    def _fetch_file(self, name: str, version: str, file_path: str, local_path: Path,
+                    optional: bool, registry: RegistryStrategy,
+                    known_fingerprint: Optional[str]) -> Optional[Tuple[int, Optional[str], str]]:
+        """
+        Save a file from its registry, or from the next ones if that fails
+
+        Returns the size, fingerprint and SHA-256 of the file, or None if the
+        local copy is up to date. The error of the last registry tried is
+        raised. A missing optional file is not looked for on other registries.
+        """
+        file_id = f"{name}@{version}/{file_path}"
+        candidates = self._failover_order(registry)
+        for index, candidate in enumerate(candidates):
+            try:
+                return self._fetch_from(candidate, name, version, file_path, local_path,
+                                        known_fingerprint)
+            except Exception as e:
+                not_found = (isinstance(e, FileNotFoundError) or
+                             (isinstance(e, urllib.error.HTTPError) and e.code == 404))
+                if index + 1 == len(candidates) or (optional and not_found):
+                    raise
+                self.reporter.log(f"  ↻ {file_id}: {candidate.registry_url} failed ({e}), "
+                                  f"trying {candidates[index + 1].registry_url}")
+
+    @staticmethod
+    def _fetch_from(registry: RegistryStrategy, name: str, version: str, file_path: str,
+                    local_path: Path,
+                    known_fingerprint: Optional[str]) -> Optional[Tuple[int, Optional[str], str]]:
+        """Save a file from a registry, see _fetch_file"""
+        # Go through a temporary file so that an interrupted download never
+        # leaves a partial file
+        part_path = local_path.with_name(local_path.name + '.part')
+        try:
+            result = registry.get_file_to(name, version, file_path, part_path,
+                                          known_fingerprint)
+            if result is None:
+                return None
+            # Hashed while the file is still in the page cache
+            sha256 = file_sha256(part_path)
+            os.replace(part_path, local_path)
+            return result[0], result[1], sha256
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+
+    def _download_task(self, task: DownloadTask) -> bool:
+        """Download a single planned file"""
+        return self.download_file(task.name, task.version, task.file_path,
+                                  task.local_path, task.optional, task.registry)
+
+    def _plan_downloads(self) -> List[DownloadTask]:
+        """
+        Flatten packages into one task per file, so the worker pool stays busy
+        across package boundaries
+
+        With mirrors, packages are assigned to the registries in turn. All
+        files of a package come from the same one, so a tarball is normally
+        never downloaded from two registries, and the assignment is the same
+        on every run as long as the dependencies don't change. The other
+        registries are only used when the assigned one fails.
+        """
+        tasks = []
+        for index, pkg in enumerate(self.dependencies):
+            registry = self.registries[index % len(self.registries)]
+            # Shared by all files of the package
+            prefix = f"{pkg.name}@{pkg.version}"
+            pkg_dir = self.libs_dir / prefix
+            map_prefix = f"ojs-offline-libs/{prefix}"
+            for file_path, optional in ([(path, False) for path in pkg.files] +
+                                        [(path, True) for path in pkg.optional_files]):
+                tasks.append(DownloadTask(
+                    pkg.name, pkg.version, file_path,
+                    local_path=pkg_dir / file_path,
+                    optional=optional,
+                    # Map with the package version for flexibility
+                    map_key=f"{prefix}/{file_path}",
+                    map_value=f"{map_prefix}/{file_path}",
+                    # First file is the main entry
+                    main=not optional and file_path == pkg.files[0],
+                    registry=registry,
+                ))
+            # Any registry may get the files of the package by failover
+            for candidate in self.registries:
+                candidate.prepare(pkg.name, pkg.version, pkg.files, pkg.optional_files)
+        return tasks
+
+    def _record(self, task: DownloadTask) -> None:
+        """Remember a downloaded file for the dependency map"""
+        self.successes.append(task)
+
+    def build_dependency_map(self) -> Dict[str, str]:
+        """Map the downloaded files, and each package to its main file"""
+        dependency_map = {task.map_key: task.map_value for task in self.successes}
+        for task in self.successes:
+            if task.main:
+                dependency_map[f"{task.name}@{task.version}"] = task.map_value
+                dependency_map[task.name] = task.map_value
+        return dependency_map
+
+    def download_all(self) -> None:
+        """Download all files of all packages in parallel"""
+        tasks = self._plan_downloads()
+
+        # Create each directory once, rather than before every file
+        for directory in {task.local_path.parent for task in tasks}:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        if not self.force:
+            self._present = self.scan_libs_dir()
+
+        print(f"📦 Downloading {len(tasks)} files from {len(self.dependencies)} packages "
+              f"({self.jobs} parallel jobs)")
+
+        self.reporter.start(len(tasks))
+        try:
+            executor = ThreadPoolExecutor(max_workers=self.jobs)
+            futures = {
+                executor.submit(self._download_task, task): task
+                for task in tasks
+            }
+            try:
+                # Results are recorded from this thread only, so they need no lock
+                for future in as_completed(futures):
+                    if future.result():
+                        self._record(futures[future])
+            except BaseException:
+                # Don't start the queued downloads, e.g. on Ctrl-C
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+                raise
+            executor.shutdown()
+        finally:
+            self.reporter.stop()
 
     def save_dependency_map(self) -> None:
         """Save dependency map to JSON file"""
         map_path = self.base_dir / "resources" / "dependency-map.json"
+        self.dependency_map = self.build_dependency_map()
         print(f"\n💾 Saving dependency map to: {map_path.relative_to(self.base_dir)}")
 
-        with open(map_path, 'w') as f:
-            json.dump(self.dependency_map, f, indent=2, sort_keys=True)
+        # Sorted, so the committed file only changes when its entries do
+        map_path.write_bytes(dump_json(self.dependency_map))
 
         print(f"   ✓ Saved {len(self.dependency_map)} entries")
 
@@ -727,15 +1942,9 @@ class DependencyDownloader:
         print("SUMMARY")
         print("="*60)
 
-        total_size = 0
-        for root, dirs, files in os.walk(self.libs_dir):
-            for file in files:
-                file_path = Path(root) / file
-                total_size += file_path.stat().st_size
-
         print(f"✓ Total packages: {len(self.dependencies)}")
-        print(f"✓ Total files: {len(self.dependency_map) // 3}")  # Rough estimate
-        print(f"✓ Total size: {total_size / (1024*1024):.1f} MB")
+        print(f"✓ Total files: {self.file_count}")
+        print(f"✓ Total size: {self.total_bytes / (1024*1024):.1f} MB")
 
         if self.failed_downloads:
             print(f"\n⚠ FAILED REQUIRED DOWNLOADS: {len(self.failed_downloads)}")
@@ -757,7 +1966,10 @@ class DependencyDownloader:
         print(f"Target directory: {self.base_dir}")
         print(f"Libraries directory: {self.libs_dir}")
         print(f"Registry: {self.registry_url}")
+        for mirror, _ in self.mirrors:
+            print(f"Mirror: {mirror}")
         print(f"Timeout: {self.timeout}s")
+        print(f"Parallel jobs: {self.jobs}")
         print()
 
         try:
@@ -765,11 +1977,11 @@ class DependencyDownloader:
             self.libs_dir.mkdir(parents=True, exist_ok=True)
 
             # Download all packages
-            for name, config in self.dependencies.items():
-                self.download_package(name, config)
+            self.download_all()
 
             # Save dependency map
             self.save_dependency_map()
+            self.save_cache_manifest()
 
             # Print summary
             self.print_summary()
@@ -778,7 +1990,9 @@ class DependencyDownloader:
             return 1 if self.failed_downloads else 0
         finally:
             # Cleanup registry resources (e.g., cached tarballs)
-            self.registry.cleanup()
+            for registry in self.registries:
+                registry.cleanup()
+            self.http.close()
 
 
 def main():
@@ -801,7 +2015,24 @@ def main():
         '--timeout',
         type=int,
         help='Download timeout in seconds (default: 30)',
-        default=30
+        default=None
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help=f'Number of files to download in parallel (default: {DEFAULT_JOBS})',
+        default=None
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Download all files again, even if they are unchanged since the last run'
+    )
+    parser.add_argument(
+        '--no-cdn-fallback',
+        action='store_true',
+        help=f'With npm registries, never fetch files from {PUBLIC_CDN_URL} '
+             '(always download package tarballs from the registry)'
     )
     parser.add_argument(
         '-t', '--registry-type',
@@ -823,7 +2054,7 @@ def main():
     )
 
     timeout = (
-        args.timeout if args.timeout != 30 else
+        args.timeout if args.timeout is not None else
         int(os.environ.get('NPM_TIMEOUT', config.get('timeout', 30)))
     )
 
@@ -836,6 +2067,30 @@ def main():
     )
     registry_type = RegistryType(registry_type_str)
 
+    # Additional registries sharing the downloads, from the config file only.
+    # Each one is a URL, or an object with its own registry and registry_type.
+    mirror_entries = config.get('mirrors') or []
+    if isinstance(mirror_entries, (str, dict)):
+        mirror_entries = [mirror_entries]
+    mirrors = []
+    for entry in mirror_entries:
+        if isinstance(entry, dict):
+            mirror, mirror_type = entry.get('registry'), entry.get('registry_type') or 'auto'
+        else:
+            mirror, mirror_type = entry, 'auto'
+        if not isinstance(mirror, str) or not mirror:
+            print(f"⚠ Skipping invalid mirror entry: {entry}")
+            continue
+        if not validate_registry_url(mirror):
+            print(f"⚠ Warning: Proceeding with potentially invalid mirror URL")
+        mirrors.append((mirror, RegistryType(mirror_type)))
+
+    # Parallel downloads with priority: CLI > ENV > Config file > Default
+    jobs = (
+        args.jobs if args.jobs is not None else
+        int(os.environ.get('NPM_JOBS', config.get('jobs', DEFAULT_JOBS)))
+    )
+
     # Determine base directory (where this script is located)
     script_dir = Path(__file__).parent.resolve()
 
@@ -849,13 +2104,18 @@ def main():
 
     # Merge: custom libraries are added to built-in ones
     # Custom libs with same name will override built-in
-    all_dependencies = {**DEPENDENCIES, **custom_libs}
+    all_dependencies = {pkg.name: pkg for pkg in DEPENDENCIES}
+    all_dependencies.update(custom_libs)
 
     # Run downloader with merged dependencies
     downloader = DependencyDownloader(
         script_dir, registry_url, timeout,
-        dependencies=all_dependencies,
-        registry_type=registry_type
+        dependencies=tuple(all_dependencies.values()),
+        registry_type=registry_type,
+        jobs=jobs,
+        force=args.force,
+        cdn_fallback=not args.no_cdn_fallback,
+        mirrors=tuple(mirrors)
     )
     exit_code = downloader.run()
 